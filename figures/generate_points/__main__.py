@@ -1,25 +1,35 @@
+import os
+
+import matplotlib
+if not os.environ.get("SHOW"):
+    matplotlib.use("Agg")
+
 import numpy as np
 import networkx as nx
 import matplotlib.pyplot as plt
-from matplotlib.patches import Circle
-import os
+from matplotlib.collections import LineCollection
+from matplotlib.markers import MarkerStyle
+from scipy import sparse
+from scipy.spatial.distance import pdist, squareform
+
+rng = np.random.default_rng(256)
+script_dir = os.path.dirname(os.path.abspath(__file__))
 
-np.random.seed(256)
+def uniform_buffer(rng, size=8192):
+    while True:
+        yield from rng.random(size).tolist()
 
 def generate_low_low(n=60, m=120):
     G = nx.gnm_random_graph(n, m)
-    pos = {i: (np.random.random(), np.random.random()) for i in range(n)}
+    pos = {i: (rng.random(), rng.random()) for i in range(n)}
     return G, pos
 
 def generate_low_high(n=60, m=2):
     G = nx.barabasi_albert_graph(n, m)
     pos = nx.spring_layout(G, iterations=50)
-    x_coords = [pos[i][0] for i in range(n)]
-    y_coords = [pos[i][1] for i in range(n)]
-    x_min, x_max = min(x_coords), max(x_coords)
-    y_min, y_max = min(y_coords), max(y_coords)
-    pos = {i: ((pos[i][0]-x_min)/(x_max-x_min), (pos[i][1]-y_min)/(y_max-y_min)) 
-           for i in range(n)}
+    pos_arr = np.array([pos[i] for i in range(n)])
+    pos_arr = (pos_arr - pos_arr.min(axis=0)) / (pos_arr.max(axis=0) - pos_arr.min(axis=0))
+    pos = dict(enumerate(map(tuple, pos_arr.tolist())))
     return G, pos
 
 def generate_high_low(n=60, k=5, p=0.1):
@@ -29,8 +39,8 @@ def generate_high_low(n=60, k=5, p=0.1):
     for i in range(n):
         row = i // grid_size
         col = i % grid_size
-        pos[i] = (col / grid_size + np.random.uniform(-0.05, 0.05), 
-                  row / grid_size + np.random.uniform(-0.05, 0.05))
+        pos[i] = (col / grid_size + rng.uniform(-0.05, 0.05), 
+                  row / grid_size + rng.uniform(-0.05, 0.05))
     return G, pos
 
 def generate_high_high(n=60, m=120):
@@ -43,14 +53,14 @@ def generate_high_high(n=60, m=120):
     
     pos = {}
     for i in range(n):
-        pos[i] = (np.random.random(), np.random.random())
+        pos[i] = (rng.random(), rng.random())
     
     edges_added = 0
     target_edges = m
     
     for hub in hubs:
-        n_connections = np.random.randint(8, 13)
-        targets = np.random.choice(regular_nodes, size=min(n_connections, len(regular_nodes)), replace=False)
+        n_connections = rng.integers(8, 13)
+        targets = rng.choice(regular_nodes, size=min(n_connections, len(regular_nodes)), replace=False)
         for target in targets:
             if edges_added < target_edges:
                 G.add_edge(hub, target)
@@ -58,43 +68,89 @@ def generate_high_high(n=60, m=120):
     
     for i in range(len(hubs)):
         for j in range(i+1, len(hubs)):
-            if edges_added < target_edges and np.random.random() < 0.6:
+            if edges_added < target_edges and rng.random() < 0.6:
                 G.add_edge(hubs[i], hubs[j])
                 edges_added += 1
     
+    pos_arr = np.array([pos[i] for i in range(n)])
+    pairwise = squareform(pdist(pos_arr))
+    adjacent = nx.to_numpy_array(G, nodelist=range(n), dtype=bool)
+    is_hub = np.arange(n) < n_hubs
+    
+    uniforms = uniform_buffer(rng)
+    
+    def pick(k):
+        return int(next(uniforms) * k)
+    
+    def connect(u, v):
+        G.add_edge(u, v)
+        adjacent[u, v] = adjacent[v, u] = True
+    
     while edges_added < target_edges:
-        node = np.random.choice(regular_nodes)
+        node = regular_nodes[pick(len(regular_nodes))]
         neighbors = list(G.neighbors(node))
         
         if len(neighbors) >= 2:
-            n1, n2 = np.random.choice(neighbors, size=2, replace=False)
+            a = pick(len(neighbors))
+            b = pick(len(neighbors) - 1)
+            n1, n2 = neighbors[a], neighbors[b + (b >= a)]
             if not G.has_edge(n1, n2):
-                G.add_edge(n1, n2)
+                connect(n1, n2)
                 edges_added += 1
                 continue
         
         if len(neighbors) < 6:
-            distances = [(other, np.sqrt((pos[node][0]-pos[other][0])**2 + 
-                                        (pos[node][1]-pos[other][1])**2)) 
-                        for other in regular_nodes if other != node and not G.has_edge(node, other)]
-            if distances:
-                distances.sort(key=lambda x: x[1])
-                candidates = [d[0] for d in distances[:10]]
-                if candidates:
-                    target = np.random.choice(candidates)
-                    G.add_edge(node, target)
-                    edges_added += 1
-                    continue
+            distances = pairwise[node].copy()
+            distances[adjacent[node] | is_hub] = np.inf
+            distances[node] = np.inf
+            
+            k = min(10, n - 1)
+            candidates = np.argpartition(distances, k)[:k]
+            candidates = candidates[np.isfinite(distances[candidates])]
+            if candidates.size:
+                target = candidates[pick(candidates.size)]
+                connect(node, target)
+                edges_added += 1
+                continue
         
-        available_pairs = [(i, j) for i in range(n) for j in range(i+1, n) 
-                          if not G.has_edge(i, j)]
-        if available_pairs:
-            i, j = available_pairs[np.random.randint(len(available_pairs))]
-            G.add_edge(i, j)
+        pair = None
+        for _ in range(n):
+            i, j = pick(n), pick(n)
+            if i != j and not G.has_edge(i, j):
+                pair = (i, j)
+                break
+        
+        if pair is None:
+            nonedges = list(nx.complement(G).edges())
+            if nonedges:
+                pair = nonedges[pick(len(nonedges))]
+        
+        if pair is not None:
+            connect(*pair)
             edges_added += 1
     
     return G, pos
 
+NODE_MARKER = MarkerStyle('o')
+
+def edge_array(G):
+    return np.array(list(G.edges()), dtype=np.int64).reshape(-1, 2)
+
+def position_array(G, pos):
+    return np.array([pos[i] for i in range(G.number_of_nodes())])
+
+def average_clustering(edges, n):
+    A = sparse.csr_matrix((np.ones(len(edges)), (edges[:, 0], edges[:, 1])), shape=(n, n))
+    A = A + A.T
+    
+    degrees = np.asarray(A.sum(axis=1)).ravel()
+    triangles = np.asarray((A @ A).multiply(A).sum(axis=1)).ravel() / 2
+    possible = degrees * (degrees - 1) / 2
+    
+    clustering = np.zeros(n)
+    np.divide(triangles, possible, out=clustering, where=possible > 0)
+    return clustering.mean()
+
 def plot_network(G, pos, title, ax):
     ax.set_aspect('equal')
     ax.set_xlim(-0.05, 1.05)
@@ -102,44 +158,46 @@ def plot_network(G, pos, title, ax):
     ax.axis('off')
     ax.set_title(title, fontsize=10, pad=10)
     
-    degrees = [d for _, d in G.degree()]
-    if max(degrees) > 0:
-        node_sizes = 50 + 400 * (np.array(degrees) / max(degrees))
+    pos_arr = position_array(G, pos)
+    edges_arr = edge_array(G)
+    
+    degrees = np.bincount(edges_arr.ravel(), minlength=len(pos_arr))
+    if degrees.max() > 0:
+        node_sizes = 50 + 400 * (degrees / degrees.max())
     else:
-        node_sizes = [50] * len(degrees)
+        node_sizes = np.full(len(degrees), 50)
     
-    for u, v in G.edges():
-        x1, y1 = pos[u]
-        x2, y2 = pos[v]
-        ax.plot([x1, x2], [y1, y2], 'gray', linewidth=0.5, alpha=0.3, zorder=1)
+    segments = pos_arr[edges_arr].reshape(-1, 2, 2)
+    ax.add_collection(LineCollection(segments, colors='gray',
+                                     linewidths=0.5, alpha=0.3, zorder=1,
+                                     rasterized=True))
     
-    x_coords = [pos[i][0] for i in G.nodes()]
-    y_coords = [pos[i][1] for i in G.nodes()]
-    ax.scatter(x_coords, y_coords, s=node_sizes, c='steelblue', 
-               alpha=0.7, edgecolors='white', linewidths=0.5, zorder=2)
+    x_coords, y_coords = np.ascontiguousarray(pos_arr.T, dtype=np.float32)
+    ax.scatter(x_coords, y_coords, s=node_sizes.astype(np.float32), marker=NODE_MARKER,
+               c='steelblue', alpha=0.7, edgecolors='white', linewidths=0.5, zorder=2)
 
 def to_tikz(G, pos, title):
-    tikz = f"% {title}\n"
-    tikz += "\\begin{tikzpicture}[scale=2.5]\n"
+    parts = [f"% {title}\n", "\\begin{tikzpicture}[scale=2.5]\n"]
     
-    degrees = [d for _, d in G.degree()]
-    if max(degrees) > 0:
-        node_sizes = 0.01 + 0.04 * (np.array(degrees) / max(degrees))
+    pos_arr = position_array(G, pos)
+    edges_arr = edge_array(G)
+    
+    degrees = np.bincount(edges_arr.ravel(), minlength=len(pos_arr))
+    if degrees.max() > 0:
+        node_sizes = 0.01 + 0.04 * (degrees / degrees.max())
     else:
-        node_sizes = [0.01] * len(degrees)
+        node_sizes = np.full(len(degrees), 0.01)
     
-    for u, v in G.edges():
-        x1, y1 = pos[u]
-        x2, y2 = pos[v]
-        tikz += f"  \\draw[white, line width=0.3pt, opacity=0.2] ({x1:.4f},{y1:.4f}) -- ({x2:.4f},{y2:.4f});\n"
+    endpoints = pos_arr[edges_arr].reshape(-1, 4)
+    edge_line = "  \\draw[white, line width=0.3pt, opacity=0.2] (%.4f,%.4f) -- (%.4f,%.4f);\n"
+    parts.append((edge_line * len(endpoints)) % tuple(endpoints.ravel().tolist()))
     
-    for i, node in enumerate(G.nodes()):
-        x, y = pos[node]
-        size = node_sizes[i]
-        tikz += f"  \\fill[white, opacity=0.5] ({x:.4f},{y:.4f}) circle ({size:.4f});\n"
+    nodes = np.column_stack([pos_arr, node_sizes])
+    node_line = "  \\fill[white, opacity=0.5] (%.4f,%.4f) circle (%.4f);\n"
+    parts.append((node_line * len(nodes)) % tuple(nodes.ravel().tolist()))
     
-    tikz += "\\end{tikzpicture}\n"
-    return tikz
+    parts.append("\\end{tikzpicture}\n")
+    return "".join(parts)
 
 networks = [
     ("low_clust_low_hetero", "Low Clustering, Low Heterogeneity", 
@@ -161,9 +219,11 @@ axes = axes.flatten()
 for idx, (filename, title, (G, pos)) in enumerate(networks):
     print(f"\n{title.replace(chr(10), ' ')}")
     print(f"Nodes: {G.number_of_nodes()}, Edges: {G.number_of_edges()}")
-    print(f"Avg Clustering: {nx.average_clustering(G):.3f}")
     
-    degrees = [d for _, d in G.degree()]
+    edges = edge_array(G)
+    degrees = np.bincount(edges.ravel(), minlength=G.number_of_nodes())
+    
+    print(f"Avg Clustering: {average_clustering(edges, G.number_of_nodes()):.3f}")
     degree_heterogeneity = np.std(degrees) / np.mean(degrees) if np.mean(degrees) > 0 else 0
     print(f"Degree heterogeneity (std/mean): {degree_heterogeneity:.3f}")
     print(f"Degree range: {min(degrees)} - {max(degrees)}")
@@ -176,10 +236,10 @@ for idx, (filename, title, (G, pos)) in enumerate(networks):
         f.write(tikz_code)
     print(f"Saved TikZ to: {output_file}")
 
-script_dir = os.path.dirname(os.path.abspath(__file__))
 plt.tight_layout()
 plt.savefig(os.path.join(script_dir, "model.png"), dpi=300, bbox_inches='tight')
 print("\n" + "=" * 60)
 print(f"Matplotlib figure saved to: {os.path.join(script_dir, 'model.png')}")
 print("All networks generated successfully!")
-plt.show()
\ No newline at end of file
+if os.environ.get("SHOW"):
+    plt.show()
\ No newline at end of file
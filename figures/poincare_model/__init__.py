@@ -1,73 +1,305 @@
 import numpy as np
 import matplotlib.pyplot as plt
+from matplotlib.collections import LineCollection
+from matplotlib.markers import MarkerStyle
 import os
+import functools
+
+try:
+    import numba
+except ImportError:
+    numba = None
+
+_NUMBA_MIN_N = 1000
+_BLOCK_SIZE = 512
+_PRUNE_EPSILON = 1e-9
+_NODE_MARKER = MarkerStyle('o')
+
+def _pruning_cutoff(L, beta):
+    # cosh(x) - 1 beyond which the connection probability drops below
+    # _PRUNE_EPSILON; for beta = inf this is exactly the step at x = L
+    margin = 0 if np.isinf(beta) else 2 * np.log(1 / _PRUNE_EPSILON) / beta
+    with np.errstate(over='ignore'):
+        return np.cosh(L + margin) - 1
+
+def _radial_bands(r, theta):
+    # Nodes grouped into unit-width radial bands, each sorted by angle and
+    # repeated at theta - 2pi and theta + 2pi so that angular windows around
+    # any node are contiguous slices; the copies are kept in float64 so they
+    # sit exactly 2pi apart and a full-circle window cannot drop a pair
+    band = np.floor(r).astype(np.int64)
+    order = np.lexsort((theta, band))
+    _, counts = np.unique(band, return_counts=True)
+    bounds = np.concatenate([[0], np.cumsum(counts)])
+    
+    band_theta = []
+    band_index = []
+    band_sinh = []
+    for start, stop in zip(bounds[:-1], bounds[1:]):
+        idx = order[start:stop]
+        t = theta[idx].astype(np.float64)
+        band_theta.append(np.concatenate([t - 2 * np.pi, t, t + 2 * np.pi]))
+        band_index.append(np.tile(idx, 3))
+        band_sinh.append(np.sinh(np.float64(r[idx].min())))
+    
+    return (3 * bounds, np.concatenate(band_theta), 
+            np.concatenate(band_index).astype(np.int32), np.array(band_sinh))
+
+def _window_width(sinh_r, band_sinh, cutoff):
+    # cosh x >= 1 + 2 sinh r_i sinh r_j sin^2(dtheta / 2), so any pair inside
+    # the cutoff has sin^2(dtheta / 2) below q
+    with np.errstate(divide='ignore', over='ignore'):
+        q = cutoff / (2 * sinh_r * band_sinh)
+    return np.where(q >= 1, np.pi, 2 * np.arcsin(np.sqrt(np.minimum(q, 1))))
+
+if numba is not None:
+    @numba.njit(cache=True)
+    def _uniform(seed, k):
+        # k-th output of a splitmix64 stream, so each pair draws the
+        # same value regardless of thread scheduling
+        z = seed + (k + np.uint64(1)) * np.uint64(0x9E3779B97F4A7C15)
+        z = (z ^ (z >> np.uint64(30))) * np.uint64(0xBF58476D1CE4E5B9)
+        z = (z ^ (z >> np.uint64(27))) * np.uint64(0x94D049BB133111EB)
+        z = z ^ (z >> np.uint64(31))
+        return (z >> np.uint64(11)) * (1.0 / 9007199254740992.0)
+    
+    # ninf/nnan are left out so that beta = inf keeps its meaning
+    _FASTMATH = {'nsz', 'arcp', 'contract', 'afn', 'reassoc'}
+    
+    @numba.njit(cache=True, fastmath=_FASTMATH)
+    def _accept(r, sr, theta, beta, L, seed, i, j):
+        n = theta.shape[0]
+        
+        h = np.sin((theta[i] - theta[j]) / 2)
+        c = np.cosh(r[i] - r[j]) + 2 * sr[i] * sr[j] * h * h
+        x = np.arccosh(max(c, 1.0))
+        
+        u = _uniform(seed, np.uint64(i) * np.uint64(n) + np.uint64(j))
+        
+        if np.isinf(beta):
+            return x <= L
+        return u < 1 / (np.exp(beta * (x - L) * 0.5) + 1)
+    
+    @numba.njit(cache=True, error_model='numpy')
+    def _window(theta_i, sr_i, cutoff, offsets, band_theta, band_sinh, b):
+        q = cutoff / (2 * sr_i * band_sinh[b])
+        w = np.pi if q >= 1 else 2 * np.arcsin(np.sqrt(q))
+        
+        band = band_theta[offsets[b]:offsets[b + 1]]
+        lo = np.searchsorted(band, theta_i - w) + offsets[b]
+        hi = np.searchsorted(band, theta_i + w) + offsets[b]
+        return lo, hi
+    
+    def _sample_edges_numba(r, theta, beta, L, seed, cutoff, 
+                            offsets, band_theta, band_index, band_sinh, budget):
+        n = r.shape[0]
+        n_bands = band_sinh.shape[0]
+        sr = np.sinh(r)
+        
+        # Window sizes bound the candidates of each row, so rows can be taken
+        # in chunks whose accepted partners fit in one scratch buffer
+        bounds = np.zeros(n, dtype=np.int64)
+        for i in numba.prange(n):
+            bound = 0
+            for b in range(n_bands):
+                lo, hi = _window(theta[i], sr[i], cutoff, 
+                                 offsets, band_theta, band_sinh, b)
+                bound += hi - lo
+            bounds[i] = bound
+        
+        scratch = np.empty(max(budget, bounds.max()), dtype=np.int32)
+        counts = np.zeros(n, dtype=np.int32)
+        degrees = np.zeros(n, dtype=np.int32)
+        
+        edges_i = np.empty(n, dtype=np.int32)
+        edges_j = np.empty(n, dtype=np.int32)
+        n_edges = 0
+        
+        start = 0
+        while start < n:
+            stop = start
+            total = 0
+            while stop < n and total + bounds[stop] <= scratch.shape[0]:
+                total += bounds[stop]
+                stop += 1
+            
+            row_offsets = np.zeros(stop - start + 1, dtype=np.int64)
+            row_offsets[1:] = np.cumsum(bounds[start:stop])
+            
+            for t in numba.prange(stop - start):
+                i = start + t
+                e = row_offsets[t]
+                for b in range(n_bands):
+                    lo, hi = _window(theta[i], sr[i], cutoff, 
+                                     offsets, band_theta, band_sinh, b)
+                    for k in range(lo, hi):
+                        j = band_index[k]
+                        if j > i and _accept(r, sr, theta, beta, L, seed, i, j):
+                            scratch[e] = j
+                            e += 1
+                counts[i] = e - row_offsets[t]
+            
+            added = counts[start:stop].sum()
+            if n_edges + added > edges_i.shape[0]:
+                capacity = max(2 * edges_i.shape[0], n_edges + added)
+                edges_i = np.concatenate((edges_i[:n_edges], np.empty(capacity - n_edges, dtype=np.int32)))
+                edges_j = np.concatenate((edges_j[:n_edges], np.empty(capacity - n_edges, dtype=np.int32)))
+            
+            # Degrees are counted while the accepted partners are copied out
+            for t in range(stop - start):
+                i = start + t
+                degrees[i] += counts[i]
+                for e in range(counts[i]):
+                    j = scratch[row_offsets[t] + e]
+                    edges_i[n_edges] = i
+                    edges_j[n_edges] = j
+                    degrees[j] += 1
+                    n_edges += 1
+            
+            start = stop
+        
+        return edges_i[:n_edges].copy(), edges_j[:n_edges].copy(), degrees
+    
+    # Compiled on first use rather than at import, which the default sweep
+    # never needs. The parallel kernel is not cached on disk: its cache
+    # records the importing module's name and fails to load under another
+    @functools.lru_cache(maxsize=None)
+    def _edge_sampler():
+        return numba.njit(
+            'Tuple((i4[::1], i4[::1], i4[::1]))'
+            '(f4[::1], f4[::1], f8, f8, u8, f8, i8[::1], f8[::1], i4[::1], f8[::1], i8)',
+            parallel=True, fastmath=_FASTMATH
+        )(_sample_edges_numba)
 
 class HyperbolicNetwork:
-    def __init__(self, N, gamma, k_bar, beta):
+    def __init__(self, N, gamma, k_bar, beta, seed=None, rng=None):
         self.N = N
         self.gamma = gamma
         self.k_bar = k_bar
         self.beta = beta
+        self.rng = rng if rng is not None else np.random.default_rng(seed)
         
         self.alpha = (gamma - 1) / 2
         self.L = 2 * np.log(((2 * N) / (np.pi * k_bar)) * ((gamma - 1) / (gamma - 2)) ** 2)
         
+        self._cosh_aLm1 = np.cosh(self.alpha * self.L) - 1
+        self._two_pi = np.float32(2 * np.pi)
+        self._L32 = np.float32(self.L)
+        self._beta32 = np.float32(beta)
+        
         print(f"Network parameters:")
         print(f"  N = {N}, γ = {gamma}, k̄ = {k_bar}, β = {beta}")
         print(f"  α = {self.alpha:.4f}, L = {self.L:.4f}")
         
         self.r, self.theta = self._generate_coordinates()
+        self._xy = None
+        
+        self.edges_i, self.edges_j, self.degrees = self._generate_edges()
         
-        self.edges = self._generate_edges()
-        self.degrees = self._calculate_degrees()
+        self._dmax = int(self.degrees.max()) if self.degrees.size else 0
+        if self._dmax > 0:
+            self._node_size_scale = self.degrees / self._dmax
+        else:
+            self._node_size_scale = np.zeros(self.N)
         
-        print(f"Generated network with {len(self.edges)} edges")
+        print(f"Generated network with {len(self.edges_i)} edges")
         print(f"Average degree: {np.mean(self.degrees):.2f}")
     
     def _generate_coordinates(self):
-        u = np.random.uniform(0, 1, self.N)
+        r = self.rng.random(self.N)
+        r *= self._cosh_aLm1
+        r += 1
+        np.arccosh(r, out=r)
+        r /= self.alpha
         
-        r = (1 / self.alpha) * np.arccosh(1 + (np.cosh(self.alpha * self.L) - 1) * u)
+        theta = self.rng.random(self.N, dtype=np.float32)
+        theta *= self._two_pi
         
-        theta = np.random.uniform(0, 2 * np.pi, self.N)
+        return r.astype(np.float32), theta
         
-        return r, theta
-        
-    
-    def _hyperbolic_distance(self, i, j):
-        delta_theta = np.abs(self.theta[i] - self.theta[j])
-        delta_theta = min(delta_theta, 2 * np.pi - delta_theta)
-                
-        x = np.arccosh(np.clip((
-            (np.cosh(self.r[i]) * np.cosh(self.r[j])) -
-            (np.sinh(self.r[i]) * np.sinh(self.r[j]) * np.cos(delta_theta))
-        ), 1, None))
-        
-        return x
     
     def _generate_edges(self):
-        edges = []
+        # Only pairs whose angular separation is small enough for their radii
+        # to fall within the pruning cutoff are evaluated exactly
+        cutoff = _pruning_cutoff(self.L, self.beta)
+        offsets, band_theta, band_index, band_sinh = _radial_bands(self.r, self.theta)
         
-        for i in range(self.N):
-            for j in range(i + 1, self.N):
-                x = self._hyperbolic_distance(i, j)
-                u = np.random.uniform(0, 1)
-
-                probability = 1 / (np.exp(self.beta * (x - self.L) / 2) + 1)
+        # The path depends only on N, never on the thread count, since the two
+        # paths draw their uniforms from different streams
+        if numba is not None and self.N >= _NUMBA_MIN_N:
+            seed = self.rng.integers(2 ** 63 - 1, dtype=np.uint64)
+            return _edge_sampler()(self.r, self.theta, float(self.beta), self.L, seed, 
+                                   cutoff, offsets, band_theta, band_index, band_sinh,
+                                   _BLOCK_SIZE ** 2)
+        
+        # cosh x = cosh(r_i - r_j) + 2 sinh r_i sinh r_j sin^2(dtheta / 2) is free
+        # of the cancellation in cosh r_i cosh r_j - sinh r_i sinh r_j cos(dtheta),
+        # which float32 cannot absorb at r ~ L
+        sr = np.sinh(self.r, dtype=np.float32)
+        
+        edges_i = []
+        edges_j = []
+        
+        for ib in range(0, self.N, _BLOCK_SIZE):
+            rows = np.arange(ib, min(ib + _BLOCK_SIZE, self.N), dtype=np.int32)
+            
+            lo = np.empty((rows.size, len(band_sinh)), dtype=np.int64)
+            hi = np.empty((rows.size, len(band_sinh)), dtype=np.int64)
+            for b in range(len(band_sinh)):
+                w = _window_width(sr[rows], band_sinh[b], cutoff)
                 
-                if u < probability:
-                    edges.append((i, j))
-    
-        return edges
-    
-    def _calculate_degrees(self):
-        degrees = np.zeros(self.N, dtype=int)
+                band = band_theta[offsets[b]:offsets[b + 1]]
+                lo[:, b] = np.searchsorted(band, self.theta[rows] - w) + offsets[b]
+                hi[:, b] = np.searchsorted(band, self.theta[rows] + w) + offsets[b]
+            
+            lo = lo.ravel()
+            ends = np.cumsum(hi.ravel() - lo)
+            starts = np.concatenate([[0], ends[:-1]])
+            
+            # Wide windows can pair a whole block of rows with every node, so
+            # the candidate stream is cut into tiles and gathered one at a time
+            for s in range(0, ends[-1], _BLOCK_SIZE ** 2):
+                e = min(s + _BLOCK_SIZE ** 2, ends[-1])
+                first, last = np.searchsorted(ends, [s, e - 1], side='right')
+                windows = np.arange(first, last + 1)
+                
+                tile_lo = np.maximum(starts[windows], s)
+                counts = np.minimum(ends[windows], e) - tile_lo
+                base = lo[windows] + tile_lo - starts[windows] - (np.cumsum(counts) - counts)
+                
+                i = np.repeat(rows[windows // len(band_sinh)], counts)
+                j = band_index[np.repeat(base, counts) + np.arange(e - s)]
+                
+                upper = j > i
+                i = i[upper]
+                j = j[upper]
+                
+                h = np.sin((self.theta[i] - self.theta[j]) / 2)
+                
+                x = np.arccosh(np.maximum((
+                    np.cosh(self.r[i] - self.r[j]) +
+                    (2 * sr[i] * sr[j] * h * h)
+                ), 1))
+                
+                # One draw of uniforms per tile; the step function needs none
+                if np.isinf(self.beta):
+                    mask = x <= self._L32
+                else:
+                    probability = 1 / (np.exp(self._beta32 * (x - self._L32) / 2) + 1)
+                    mask = self.rng.random(x.shape, dtype=np.float32) < probability
+                
+                edges_i.append(i[mask])
+                edges_j.append(j[mask])
         
-        for i, j in self.edges:
-            degrees[i] += 1
-            degrees[j] += 1
+        edges_i = np.concatenate(edges_i)
+        edges_j = np.concatenate(edges_j)
         
-        return degrees
+        return edges_i, edges_j, self._calculate_degrees(edges_i, edges_j)
+    
+    def _calculate_degrees(self, edges_i, edges_j):
+        degrees = np.bincount(edges_i, minlength=self.N)
+        degrees += np.bincount(edges_j, minlength=self.N)
+        return degrees.astype(np.int32)
     
     def to_poincare(self, r, theta):
         r_e = np.tanh(r / 2)
@@ -75,11 +307,21 @@ class HyperbolicNetwork:
         y = r_e * np.sin(theta)
         return x, y
     
+    def _poincare_coordinates(self):
+        if self._xy is None:
+            self._xy = self.to_poincare(self.r, self.theta)
+        return self._xy
+    
+    def _edge_endpoints(self):
+        xy = np.column_stack(self._poincare_coordinates())
+        edges = np.column_stack([self.edges_i, self.edges_j])
+        return xy[edges].reshape(-1, 4)
+    
     def plot(self, ax=None, title=None):
         if ax is None:
             fig, ax = plt.subplots(1, 1, figsize=(8, 8))
         
-        x, y = self.to_poincare(self.r, self.theta)
+        x, y = self._poincare_coordinates()
         
         ax.set_aspect('equal')
         ax.set_xlim(-1.1, 1.1)
@@ -92,17 +334,15 @@ class HyperbolicNetwork:
             ax.set_title(f'Hyperbolic Network (γ={self.gamma}, N={self.N})', 
                         fontsize=10, pad=10)
                 
-        if np.max(self.degrees) > 0:
-            node_sizes = 50 + 400 * (self.degrees / np.max(self.degrees))
-        else:
-            node_sizes = np.ones(self.N) * 50
+        node_sizes = 50 + 400 * self._node_size_scale
         
-        for i, j in self.edges:
-            ax.plot([x[i], x[j]], [y[i], y[j]], 'gray', 
-                   linewidth=0.5, alpha=0.3, zorder=1)
+        segments = self._edge_endpoints().reshape(-1, 2, 2)
+        ax.add_collection(LineCollection(segments, colors='gray',
+                                         linewidths=0.5, alpha=0.3, zorder=1,
+                                         rasterized=True))
         
-        ax.scatter(x, y, s=node_sizes, c='steelblue',
-                  alpha=0.7, edgecolors='white', linewidths=0.5, zorder=2)
+        ax.scatter(x, y, s=node_sizes.astype(np.float32), marker=_NODE_MARKER,
+                  c='steelblue', alpha=0.7, edgecolors='white', linewidths=0.5, zorder=2)
         
         return ax
     
@@ -111,24 +351,28 @@ class HyperbolicNetwork:
                 
         filepath = os.path.join(script_dir, filename)
         
-        x, y = self.to_poincare(self.r, self.theta)
+        x, y = self._poincare_coordinates()
+        
+        node_sizes = 0.01 + 0.04 * self._node_size_scale
         
-        node_sizes = 0.01 + 0.04 * (self.degrees / np.max(self.degrees))
+        endpoints = self._edge_endpoints()
+        edge_line = '  \\draw[white, line width=0.3pt, opacity=0.2] (%.4f,%.4f) -- (%.4f,%.4f);\n'
+        edge_lines = (edge_line * len(endpoints)) % tuple(endpoints.ravel().tolist())
+        
+        nodes = np.column_stack([x, y, node_sizes])
+        node_line = '  \\fill[white, opacity=0.5] (%.4f,%.4f) circle (%.4f);\n'
+        node_lines = (node_line * len(nodes)) % tuple(nodes.ravel().tolist())
         
         with open(filepath, 'w') as f:
-            f.write('\\begin{tikzpicture}[scale=0.85]\n')
-            f.write(f'  % Hyperbolic network with gamma = {self.gamma}\n')
-            f.write(f'  % N = {self.N}, k_bar = {self.k_bar}\n\n')
-            
-            f.write('  % Edges\n')
-            for i, j in self.edges:
-                f.write(f'  \\draw[white, line width=0.3pt, opacity=0.2] ({x[i]:.4f},{y[i]:.4f}) -- ({x[j]:.4f},{y[j]:.4f});\n')
-            
-            f.write('\n  % Nodes\n')
-
-            for i in range(self.N):
-                f.write(f'  \\fill[white, opacity=0.5] ({x[i]:.4f},{y[i]:.4f}) circle ({node_sizes[i]:.4f});\n')
-            
-            f.write('\\end{tikzpicture}\n')
+            f.write(
+                '\\begin{tikzpicture}[scale=0.85]\n'
+                f'  % Hyperbolic network with gamma = {self.gamma}\n'
+                f'  % N = {self.N}, k_bar = {self.k_bar}\n\n'
+                '  % Edges\n'
+                + edge_lines +
+                '\n  % Nodes\n'
+                + node_lines +
+                '\\end{tikzpicture}\n'
+            )
         
         print(f"TikZ code exported to {filepath}")
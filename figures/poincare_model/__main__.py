@@ -1,10 +1,15 @@
+import os
+
+import matplotlib
+if not os.environ.get("SHOW"):
+    matplotlib.use("Agg")
+
 import numpy as np
 import matplotlib.pyplot as plt
-import os
 
 from . import HyperbolicNetwork
 
-np.random.seed(256)
+rng = np.random.default_rng(256)
 
 if __name__ == "__main__":
     script_dir = os.path.dirname(os.path.abspath(__file__))
@@ -23,7 +28,7 @@ if __name__ == "__main__":
         for n_idx, N in enumerate(N_values):
             print(f"\n{'='*50}")
             
-            net = HyperbolicNetwork(N=N, gamma=gamma, k_bar=20, beta=np.inf)
+            net = HyperbolicNetwork(N=N, gamma=gamma, k_bar=20, beta=np.inf, rng=rng)
             net.export_tikz(f"network_gamma_{gamma}_{N}.tikz")
             
             ax = axes1[gamma_idx, n_idx]
@@ -45,7 +50,7 @@ if __name__ == "__main__":
         for n_idx, N in enumerate(N_values):
             print(f"\n{'='*50}")
             
-            net = HyperbolicNetwork(N=N, gamma=2.1, k_bar=20, beta=beta)
+            net = HyperbolicNetwork(N=N, gamma=2.1, k_bar=20, beta=beta, rng=rng)
             net.export_tikz(f"network_beta_{beta}_{N}.tikz")
             
             ax = axes2[beta_idx, n_idx]
@@ -61,4 +66,5 @@ if __name__ == "__main__":
     print(f"Generated {len(all_networks)} gamma-varied networks")
     print(f"Generated {len(beta_networks)} beta-varied networks")
     
-    plt.show()
+    if os.environ.get("SHOW"):
+        plt.show()